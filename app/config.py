@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 
 
@@ -7,6 +9,50 @@ class Settings(BaseSettings):
     mongo_uri: str = "mongodb://localhost:27017/orders"
     log_level: str = "INFO"
     idempotency_ttl_seconds: int = 86400
+    # "collection": resultado en `idempotency` (lookup + upsert extra por create)
+    # "embedded": clave en el documento de la orden (índice único sparse)
+    idempotency_mode: Literal["collection", "embedded"] = "collection"
+    # Cada cuánto se liberan las claves embebidas expiradas (sólo modo "embedded")
+    idempotency_sweep_interval_seconds: float = 3600.0
+
+    # Profiling opt-in: por header (X-Profile: <token>) o por muestreo aleatorio.
+    # Sin token configurado el header se ignora y /admin/profile queda cerrado.
+    profiling_enabled: bool = False
+    profiling_sample_rate: float = 0.0
+    profiling_header: str = "X-Profile"
+    profiling_token: str = ""
+    profiling_interval_seconds: float = 0.001
+
+    # Admission control (AIMD) para rutas que dependen de Mongo
+    admission_enabled: bool = True
+    admission_initial_limit: int = 64
+    admission_min_limit: int = 4
+    admission_max_limit: int = 512
+    admission_max_queue: int = 128
+    admission_queue_timeout_seconds: float = 1.0
+    admission_latency_target_ms: float = 250.0
+    admission_retry_after_seconds: int = 1
+
+    # PATCH /orders/{id}: serialización por orden y reintentos con expected_status
+    status_update_serialize: bool = True
+    status_update_max_waiters: int = 32
+    status_update_max_retries: int = 3
+    status_update_retry_backoff_ms: float = 10.0
+
+    # Archivado de órdenes terminales a orders_archive
+    archive_enabled: bool = False
+    archive_min_age_seconds: int = 30 * 86400
+    archive_batch_size: int = 500
+    archive_max_docs_per_second: float = 1000.0
+    archive_interval_seconds: float = 3600.0
+    archive_read_fallback: bool = True
+
+    # Compresión de respuestas (gzip; br/zstd si están instalados)
+    compression_enabled: bool = True
+    compression_minimum_size: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+    compression_zstd_level: int = 3
 
     class Config:
         env_file = ".env"
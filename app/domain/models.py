@@ -1,7 +1,7 @@
 from __future__ import annotations
 from datetime import datetime
 from decimal import Decimal
-from typing import Literal, List
+from typing import Literal, List, Optional
 from pydantic import BaseModel, Field, field_validator, field_serializer
 
 OrderStatus = Literal["CREATED", "PAID", "FULFILLED", "CANCELLED"]
@@ -38,4 +38,7 @@ class OrderOut(BaseModel):
         return format(v, "f")
 
 class StatusUpdate(BaseModel):
-    status: OrderStatus
\ No newline at end of file
+    status: OrderStatus
+    # Si se indica, un cambio de versión concurrente se reintenta en servidor
+    # mientras la orden siga en este estado (la transición sigue siendo legal)
+    expected_status: Optional[OrderStatus] = None
\ No newline at end of file
@@ -0,0 +1,228 @@
+"""
+Admission control para rutas ligadas a Mongo.
+
+Cada ruta (método + template) tiene un `AdaptiveLimiter` con límite de
+concurrencia AIMD y una cola de espera acotada. Si la cola está llena o la
+espera supera el timeout, se rechaza rápido con `Overloaded` (→ 503 + Retry-After)
+en lugar de acumular requests hasta agotar el pool de Mongo.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from contextvars import ContextVar
+from contextlib import contextmanager
+from typing import AsyncIterator, Iterator, NoReturn, Optional
+
+from fastapi import Request
+
+from app.config import settings
+from app.infra import metrics
+
+
+class Overloaded(Exception):
+    def __init__(self, route: str, reason: str, retry_after: int) -> None:
+        super().__init__(f"service overloaded ({reason})")
+        self.route = route
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def shed(route: str, reason: str) -> NoReturn:
+    """Rechaza como sobrecarga (503 + Retry-After) algo que no es la cola de admisión, p.ej. una clave caliente."""
+    metrics.admission_shed_total.labels(route=route, reason=reason).inc()
+    raise Overloaded(route, reason, settings.admission_retry_after_seconds)
+
+
+class AdaptiveLimiter:
+    """
+    Límite de concurrencia AIMD guiado por la latencia observada.
+
+    - Additive increase: +1/limit por request bajo `latency_target` (≈ +1 por
+      ventana), sólo si el límite se está usando (inflight ≥ `utilization` · limit);
+      si no, crecería sin medida durante periodos tranquilos.
+    - Multiplicative decrease: limit * `backoff` como mucho una vez por ventana:
+      sólo cuentan los requests lentos que empezaron después del último recorte,
+      ya que los anteriores fueron admitidos con el límite viejo.
+    """
+
+    def __init__(
+        self,
+        route: str,
+        *,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        max_queue: int,
+        queue_timeout: float,
+        latency_target: float,
+        backoff: float = 0.9,
+        utilization: float = 0.8,
+    ) -> None:
+        self.route = route
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.utilization = utilization
+        self.inflight = 0
+        self._last_decrease = float("-inf")
+        self._waiters: deque[asyncio.Future] = deque()
+        metrics.admission_limit.labels(route=route).set(self.limit)
+
+    async def acquire(self) -> None:
+        if self.inflight < int(self.limit) and not self._waiters:
+            self._grant()
+            return
+        if len(self._waiters) >= self.max_queue:
+            self._shed("queue_full")
+
+        fut: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        metrics.admission_queued_total.labels(route=self.route).inc()
+        metrics.admission_queue_depth.labels(route=self.route).set(len(self._waiters))
+        try:
+            await asyncio.wait({fut}, timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            # El slot pudo asignarse justo antes de cancelar: devolverlo
+            if fut.done():
+                self._release_slot()
+            else:
+                self._drop_waiter(fut)
+            raise
+        if not fut.done():
+            self._drop_waiter(fut)
+            self._shed("queue_timeout")
+
+    def release(self, latency: float) -> None:
+        now = time.monotonic()
+        if latency > self.latency_target:
+            if now - latency >= self._last_decrease:
+                self.limit = max(float(self.min_limit), self.limit * self.backoff)
+                self._last_decrease = now
+        elif self.inflight >= self.limit * self.utilization or self._waiters:
+            self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+        metrics.admission_limit.labels(route=self.route).set(self.limit)
+        self._release_slot()
+
+    def suspend(self) -> None:
+        """Deja de contar un request admitido mientras espera algo ajeno a Mongo; su slot pasa a la cola."""
+        self._release_slot()
+
+    def resume(self) -> None:
+        """Vuelve a contar un request suspendido sin pasar por la cola (ya fue admitido)."""
+        self._grant()
+
+    def _grant(self) -> None:
+        self.inflight += 1
+        metrics.admission_inflight.labels(route=self.route).set(self.inflight)
+
+    def _release_slot(self) -> None:
+        self.inflight -= 1
+        # Transferir slots libres a los siguientes en cola (FIFO)
+        while self._waiters and self.inflight < int(self.limit):
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                self.inflight += 1
+        metrics.admission_inflight.labels(route=self.route).set(self.inflight)
+        metrics.admission_queue_depth.labels(route=self.route).set(len(self._waiters))
+
+    def _drop_waiter(self, fut: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(fut)
+        except ValueError:
+            pass
+        fut.cancel()
+        metrics.admission_queue_depth.labels(route=self.route).set(len(self._waiters))
+
+    def _shed(self, reason: str) -> NoReturn:
+        shed(self.route, reason)
+
+
+class AdmissionController:
+    """Registro lazy de limiters por ruta, construidos desde `Settings`."""
+
+    def __init__(self) -> None:
+        self._limiters: dict[str, AdaptiveLimiter] = {}
+
+    def limiter_for(self, route: str) -> AdaptiveLimiter:
+        limiter = self._limiters.get(route)
+        if limiter is None:
+            limiter = AdaptiveLimiter(
+                route,
+                initial_limit=settings.admission_initial_limit,
+                min_limit=settings.admission_min_limit,
+                max_limit=settings.admission_max_limit,
+                max_queue=settings.admission_max_queue,
+                queue_timeout=settings.admission_queue_timeout_seconds,
+                latency_target=settings.admission_latency_target_ms / 1000,
+            )
+            self._limiters[route] = limiter
+        return limiter
+
+    def reset(self) -> None:
+        self._limiters.clear()
+
+
+controller = AdmissionController()
+
+
+class _Slot:
+    """Slot de admisión del request en curso y tiempo a descontar de su latencia."""
+
+    def __init__(self, limiter: AdaptiveLimiter) -> None:
+        self.limiter = limiter
+        self.excluded = 0.0
+
+
+_slot: ContextVar[Optional[_Slot]] = ContextVar("admission_slot", default=None)
+
+
+@contextmanager
+def outside_admission() -> Iterator[None]:
+    """
+    Durante el bloque el request no ocupa slot ni suma a la muestra de latencia.
+
+    Para esperas in-process (p.ej. el lock por orden): si los que esperan
+    retuvieran su slot, una orden caliente agotaría el límite de la ruta y se
+    rechazarían requests sobre otras órdenes. Al salir el slot se recupera sin
+    cola, así que el límite puede excederse un instante en un request.
+    """
+    slot = _slot.get()
+    if slot is None:
+        yield
+        return
+    slot.limiter.suspend()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        slot.excluded += time.perf_counter() - start
+        slot.limiter.resume()
+
+
+def _route_key(request: Request) -> str:
+    route = request.scope.get("route")
+    path: Optional[str] = getattr(route, "path", None)
+    return f"{request.method} {path or request.url.path}"
+
+
+async def admission(request: Request) -> AsyncIterator[None]:
+    """Dependencia FastAPI: ocupa un slot del limiter de la ruta durante el handler."""
+    if not settings.admission_enabled:
+        yield
+        return
+    limiter = controller.limiter_for(_route_key(request))
+    await limiter.acquire()
+    slot = _Slot(limiter)
+    _slot.set(slot)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        limiter.release(max(0.0, time.perf_counter() - start - slot.excluded))
@@ -0,0 +1,206 @@
+"""
+Compresión de respuestas negociada por `Accept-Encoding` (ASGI puro).
+
+- gzip siempre; brotli (`brotli`) y zstd (`zstandard`) si están instalados.
+- Bodies por debajo de `minimum_size` salen sin comprimir (el overhead de
+  CPU/cabeceras no compensa). Para decidirlo se retienen como mucho
+  `minimum_size` bytes, nunca el body completo.
+- Pasado ese umbral, la respuesta se comprime chunk a chunk con flush.
+"""
+from __future__ import annotations
+
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:  # pragma: no cover - dependencia opcional
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:  # pragma: no cover - dependencia opcional
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+_COMPRESSIBLE_TYPES = ("text/", "application/json", "application/problem+json", "application/xml", "application/javascript")
+
+
+class GzipEncoder:
+    name = "gzip"
+
+    def __init__(self, level: int = 6) -> None:
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data) + self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._obj.compress(data) + self._obj.flush(zlib.Z_FINISH)
+
+
+class BrotliEncoder:
+    name = "br"
+
+    def __init__(self, quality: int = 4) -> None:
+        self._obj = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.process(data) + self._obj.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._obj.process(data) + self._obj.finish()
+
+
+class ZstdEncoder:
+    name = "zstd"
+
+    def __init__(self, level: int = 3) -> None:
+        self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data) + self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._obj.compress(data) + self._obj.flush()
+
+
+def available_encodings() -> list[str]:
+    """Encodings soportados en orden de preferencia del servidor."""
+    encodings = []
+    if brotli is not None:
+        encodings.append("br")
+    if zstandard is not None:
+        encodings.append("zstd")
+    encodings.append("gzip")
+    return encodings
+
+
+def negotiate(accept_encoding: Optional[str], supported: list[str]) -> Optional[str]:
+    """Elige el encoding de mayor q aceptado por el cliente (empate → preferencia del servidor)."""
+    if not accept_encoding:
+        return None
+    qualities: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        qualities[coding] = q
+    wildcard = qualities.get("*", 0.0)
+    best, best_q = None, 0.0
+    for coding in supported:
+        q = qualities.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        zstd_level: int = 3,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.zstd_level = zstd_level
+        self.supported = available_encodings()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"), self.supported)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+    def encoder(self, encoding: str):
+        if encoding == "br":
+            return BrotliEncoder(self.brotli_quality)
+        if encoding == "zstd":
+            return ZstdEncoder(self.zstd_level)
+        return GzipEncoder(self.gzip_level)
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send) -> None:
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self._start: Optional[Message] = None
+        self._encoder = None
+        self._passthrough = False
+        self._buffer = b""
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # Retener cabeceras hasta ver el primer chunk del body
+            self._start = message
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            self._passthrough = "content-encoding" in headers or not content_type.startswith(_COMPRESSIBLE_TYPES)
+            return
+        if message["type"] != "http.response.body" or self._passthrough:
+            await self._flush_start()
+            await self._send(message)
+            return
+
+        body: bytes = message.get("body", b"")
+        more_body: bool = message.get("more_body", False)
+
+        if self._encoder is not None:
+            chunk = self._encoder.compress(body) if more_body else self._encoder.finish(body)
+            await self._send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+            return
+
+        # Aún sin decidir: acumular hasta minimum_size o fin del body
+        self._buffer += body
+        if more_body and len(self._buffer) < self.middleware.minimum_size:
+            return
+        data, self._buffer = self._buffer, b""
+        start = self._start
+        if start is None:
+            raise RuntimeError("response body sent before http.response.start")
+        headers = MutableHeaders(scope=start)
+        headers.add_vary_header("Accept-Encoding")
+
+        if not more_body and len(data) < self.middleware.minimum_size:
+            self._passthrough = True
+            await self._flush_start()
+            await self._send({"type": "http.response.body", "body": data, "more_body": False})
+            return
+
+        self._encoder = self.middleware.encoder(self.encoding)
+        headers["Content-Encoding"] = self.encoding
+        if more_body:
+            # Streaming: longitud final desconocida
+            del headers["Content-Length"]
+            chunk = self._encoder.compress(data)
+        else:
+            chunk = self._encoder.finish(data)
+            headers["Content-Length"] = str(len(chunk))
+        await self._flush_start()
+        await self._send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+    async def _flush_start(self) -> None:
+        if self._start is not None:
+            await self._send(self._start)
+            self._start = None
@@ -1,5 +1,5 @@
 # Prometheus metrics definitions
-from prometheus_client import Counter, Histogram
+from prometheus_client import Counter, Gauge, Histogram
 
 request_latency_seconds = Histogram(
     "request_latency_seconds",
@@ -22,4 +22,55 @@ state_transitions_total = Counter(
     "state_transitions_total",
     "Total number of state transitions.",
     ["from_status", "to_status"],
+)
+
+status_update_conflicts_total = Counter(
+    "status_update_conflicts_total",
+    "Total number of optimistic locking conflicts on status updates.",
+)
+
+status_update_retries_total = Counter(
+    "status_update_retries_total",
+    "Total number of internal retries of conditional status updates.",
+)
+
+orders_archived_total = Counter(
+    "orders_archived_total",
+    "Total number of terminal orders moved to the archive collection.",
+)
+
+archive_fallback_reads_total = Counter(
+    "archive_fallback_reads_total",
+    "Total number of order reads that fell back to the archive collection.",
+    ["result"],
+)
+
+admission_shed_total = Counter(
+    "admission_shed_total",
+    "Total number of requests rejected by admission control.",
+    ["route", "reason"],
+)
+
+admission_queued_total = Counter(
+    "admission_queued_total",
+    "Total number of requests that waited in the admission queue.",
+    ["route"],
+)
+
+admission_queue_depth = Gauge(
+    "admission_queue_depth",
+    "Current number of requests waiting for an admission slot.",
+    ["route"],
+)
+
+admission_inflight = Gauge(
+    "admission_inflight",
+    "Current number of admitted in-flight requests.",
+    ["route"],
+)
+
+admission_limit = Gauge(
+    "admission_limit",
+    "Current adaptive concurrency limit.",
+    ["route"],
 )
\ No newline at end of file
@@ -38,6 +38,12 @@ async def ensure_indexes() -> None:
     database = db()
     await database["orders"].create_index("customer_id")
     await database["orders"].create_index("status")
+    # Archivado: candidatos por estado terminal + antigüedad
+    await database["orders"].create_index([("status", 1), ("updated_at", 1)])
+    await database["orders_archive"].create_index("customer_id")
+    # Idempotencia embebida (idempotency_mode="embedded")
+    await database["orders"].create_index("idempotency_key", unique=True, sparse=True)
+    await database["orders"].create_index("idempotency_expires_at", sparse=True)
     await database["idempotency"].create_index("key", unique=True)
     # TTL para resultados de idempotencia si manejamos expiración
     await database["idempotency"].create_index("expires_at", expireAfterSeconds=0)
\ No newline at end of file
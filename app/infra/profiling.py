@@ -0,0 +1,159 @@
+"""
+Request-scoped profiling: phase timers + a stdlib stack sampler.
+
+- `phase(name)` mide secciones nombradas del request en curso (no-op si el
+  request no está siendo perfilado).
+- `StackSampler` muestrea periódicamente la pila del hilo del event loop y
+  acumula "collapsed stacks" (`frame;frame;frame count`) listos para
+  flamegraph.pl / speedscope.
+"""
+from __future__ import annotations
+
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Iterator, Optional
+
+_phases: ContextVar[Optional[dict[str, float]]] = ContextVar("profile_phases", default=None)
+
+# Límite de stacks distintos en el agregado para acotar memoria
+MAX_DISTINCT_STACKS = 10_000
+
+
+# --- Phase timing ---
+def start_phases() -> None:
+    _phases.set({})
+
+
+def get_phases() -> Optional[dict[str, float]]:
+    phases = _phases.get()
+    if phases is None:
+        return None
+    return {name: round(ms, 2) for name, ms in phases.items()}
+
+
+def clear_phases() -> None:
+    _phases.set(None)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Acumula en ms el tiempo de la sección `name` del request perfilado."""
+    phases = _phases.get()
+    if phases is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        phases[name] = phases.get(name, 0.0) + elapsed_ms
+
+
+# --- Sampling decision ---
+def is_trusted(header_value: Optional[str], token: str) -> bool:
+    """True si el header trae el token configurado (sin token, nadie es de confianza)."""
+    if not token or header_value is None:
+        return False
+    return hmac.compare_digest(header_value.strip().encode(), token.encode())
+
+
+def should_profile(header_value: Optional[str], token: str, sample_rate: float) -> bool:
+    if is_trusted(header_value, token):
+        return True
+    return sample_rate > 0 and random.random() < sample_rate  # noqa: S311
+
+
+# --- Stack sampler ---
+@lru_cache(maxsize=4096)
+def _short_path(filename: str) -> str:
+    """Ruta relativa a la entrada de sys.path más específica (no expone rutas absolutas)."""
+    best = ""
+    for entry in sys.path:
+        root = os.path.abspath(entry or os.curdir).rstrip(os.sep) + os.sep
+        if filename.startswith(root) and len(root) > len(best):
+            best = root
+    return filename[len(best):] if best else os.path.basename(filename)
+
+
+def _collapse(frame) -> str:
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+class StackSampler:
+    """
+    Muestrea la pila de `thread_id` cada `interval` segundos desde un hilo aparte.
+
+    Como el event loop es compartido, las muestras incluyen también trabajo de
+    otros requests concurrentes; por eso sólo se permite un muestreo activo a
+    la vez y el agregado debe leerse como "hot paths mientras se perfilaba".
+    """
+
+    _active = threading.Lock()
+
+    def __init__(self, thread_id: int, interval: float = 0.001) -> None:
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> bool:
+        """Arranca el muestreo; devuelve False si ya hay otro sampler activo."""
+        if not StackSampler._active.acquire(blocking=False):
+            return False
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self) -> Counter[str]:
+        if self._thread is None:
+            return self.samples
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        StackSampler._active.release()
+        return self.samples
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.samples[_collapse(frame)] += 1
+
+
+# --- Aggregate (hot paths) ---
+_aggregate: Counter[str] = Counter()
+_aggregate_lock = threading.Lock()
+
+
+def record_samples(samples: Counter[str]) -> None:
+    with _aggregate_lock:
+        for stack, count in samples.items():
+            if stack in _aggregate or len(_aggregate) < MAX_DISTINCT_STACKS:
+                _aggregate[stack] += count
+
+
+def collapsed_stacks() -> str:
+    """Formato collapsed (Brendan Gregg): una línea `stack count` por stack."""
+    with _aggregate_lock:
+        lines = [f"{stack} {count}" for stack, count in _aggregate.most_common()]
+    return "\n".join(lines) + ("\n" if lines else "")
+
+
+def reset_samples() -> None:
+    with _aggregate_lock:
+        _aggregate.clear()
@@ -1,5 +1,7 @@
 import asyncio
+import contextlib
 import logging
+import threading
 import time
 import uuid
 from contextlib import asynccontextmanager
@@ -14,10 +16,16 @@ from pymongo.errors import PyMongoError
 from app.config import settings
 from app.domain import errors as domain_errors
 from app.infra.logging import configure_logging
+from app.infra import profiling
+from app.infra.admission import Overloaded
+from app.infra.compression import CompressionMiddleware
 from app.infra.mongo import close_mongo_connection, connect_to_mongo, ensure_indexes, db
+from app.routes.admin import router as admin_router
 from app.routes.metrics import router as metrics_router
 from app.routes.orders import router as orders_router
 from app.routes import health as health_router
+from app.services.archive_service import run_archiver
+from app.services.orders_service import run_idempotency_sweeper
 from app.utils import request_context
 from app.utils.errors import problem
 
@@ -33,10 +41,24 @@ async def lifespan(app: FastAPI):
     try:
         await ensure_indexes()
     except Exception as e:
+        if settings.idempotency_mode == "embedded":
+            # Sin el índice único sparse de idempotency_key no hay deduplicación: no arrancar
+            log.error("lifespan.startup.ensure_indexes.failed", error=str(e), idempotency_mode="embedded")
+            await close_mongo_connection()
+            raise
         log.warning("lifespan.startup.ensure_indexes.failed", error=str(e))
+    background = []
+    if settings.archive_enabled:
+        background.append(asyncio.create_task(run_archiver()))
+    if settings.idempotency_mode == "embedded":
+        background.append(asyncio.create_task(run_idempotency_sweeper()))
     log.info("Application startup complete")
     yield
     log.info("lifespan.shutdown.begin")
+    for task in background:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
     await close_mongo_connection()
     log.info("lifespan.shutdown.end")
 
@@ -57,19 +79,39 @@ async def logging_middleware(request: Request, call_next):
     )
     request_log = structlog.get_logger("api.request")
 
+    # Profiling opt-in (header con token o muestreo), sólo si está habilitado en Settings
+    sampler = None
+    if settings.profiling_enabled and profiling.should_profile(
+        request.headers.get(settings.profiling_header), settings.profiling_token, settings.profiling_sample_rate
+    ):
+        profiling.start_phases()
+        sampler = profiling.StackSampler(threading.get_ident(), settings.profiling_interval_seconds)
+        if not sampler.start():
+            sampler = None
+
     start_time = time.perf_counter()
     request_log.info("request_started", method=request.method, path=request.url.path)
 
-    response = await call_next(request)
+    try:
+        response = await call_next(request)
+    finally:
+        if sampler is not None:
+            profiling.record_samples(sampler.stop())
     response.headers["X-Request-Id"] = request_id
     status_code = response.status_code
 
     duration = time.perf_counter() - start_time
+    extra = {}
+    phases = profiling.get_phases()
+    if phases is not None:
+        extra["phases"] = phases
     request_log.info(
         "request_finished",
         status_code=status_code,
         duration_ms=round(duration * 1000, 2),
+        **extra,
     )
+    profiling.clear_phases()
     request_context.clear_context()
     return response
 
@@ -83,8 +125,18 @@ app = FastAPI(
 
 # Middleware & Routers
 app.middleware("http")(logging_middleware)
+if settings.compression_enabled:
+    # Registrado después → envuelve también al logging_middleware y a los errores
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_minimum_size,
+        gzip_level=settings.compression_gzip_level,
+        brotli_quality=settings.compression_brotli_quality,
+        zstd_level=settings.compression_zstd_level,
+    )
 app.include_router(orders_router)
 app.include_router(metrics_router)
+app.include_router(admin_router)
 
 
 # --- Health Endpoints ---
@@ -141,6 +193,17 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     )
 
 
+@app.exception_handler(Overloaded)
+async def overloaded_exception_handler(request: Request, exc: Overloaded):
+    log.warning("admission.shed", route=exc.route, reason=exc.reason)
+    return problem(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        message=str(exc),
+        code="overloaded",
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 @app.exception_handler(domain_errors.NotFound)
 async def not_found_exception_handler(request: Request, exc: domain_errors.NotFound):
     return problem(
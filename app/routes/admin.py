@@ -0,0 +1,27 @@
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import PlainTextResponse
+
+from app.config import settings
+from app.infra import profiling
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+def _require_profiling(request: Request) -> None:
+    if not settings.profiling_enabled:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="profiling disabled")
+    if not profiling.is_trusted(request.headers.get(settings.profiling_header), settings.profiling_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="profiling token required")
+
+
+@router.get("/profile", response_class=PlainTextResponse, name="profile_stacks_endpoint")
+async def profile_stacks_endpoint(request: Request):
+    """Hot paths agregados en formato collapsed stacks (entrada para flamegraph.pl / speedscope)."""
+    _require_profiling(request)
+    return PlainTextResponse(profiling.collapsed_stacks())
+
+
+@router.delete("/profile", status_code=status.HTTP_204_NO_CONTENT, name="profile_reset_endpoint")
+async def profile_reset_endpoint(request: Request):
+    _require_profiling(request)
+    profiling.reset_samples()
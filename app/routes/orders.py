@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Header, HTTPException, Response, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
 from typing import Optional
 
 from app.domain import errors as domain_errors
 from app.domain.models import OrderIn, OrderOut, StatusUpdate
+from app.infra.admission import admission
 from app.services.orders_service import create_order, get_order, update_status
 
-router = APIRouter(prefix="/orders", tags=["orders"])
+router = APIRouter(prefix="/orders", tags=["orders"], dependencies=[Depends(admission)])
 
 @router.post("", response_model=OrderOut, status_code=status.HTTP_201_CREATED, name="create_order_endpoint")
 async def create_order_endpoint(payload: OrderIn, response: Response, idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key")):
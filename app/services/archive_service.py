@@ -0,0 +1,105 @@
+"""
+Archivado de órdenes terminales (FULFILLED/CANCELLED) a `orders_archive`.
+
+Cada lote copia (insert por `_id`) y luego borra de `orders`, así que es
+reanudable: si el proceso muere entre ambos pasos, el siguiente lote vuelve a
+copiar y los `_id` ya archivados se ignoran como duplicados. Entre lotes se
+pausa para respetar `archive_max_docs_per_second` y no competir con el tráfico
+en vivo.
+
+CLI:
+    python -m app.services.archive_service [--once]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import structlog
+from pymongo.errors import BulkWriteError
+
+from app.config import settings
+from app.infra import metrics
+from app.infra.mongo import close_mongo_connection, connect_to_mongo, db, ensure_indexes
+from app.services.orders_service import ALLOWED_TRANSITIONS
+
+log = structlog.get_logger("archiver")
+
+TERMINAL_STATUSES = sorted(status for status, targets in ALLOWED_TRANSITIONS.items() if not targets)
+
+
+async def archive_batch(cutoff: datetime, batch_size: int) -> tuple[int, int]:
+    """
+    Mueve hasta `batch_size` órdenes terminales con `updated_at < cutoff`.
+
+    Devuelve (leídas, borradas). Con un archiver por worker otro proceso puede
+    haber borrado parte del lote, así que el fin de la pasada se decide por las
+    leídas y las borradas sólo alimentan la métrica.
+    """
+    query = {"status": {"$in": TERMINAL_STATUSES}, "updated_at": {"$lt": cutoff}}
+    # Sin sort: el borrado de cada lote ya garantiza progreso, y así la consulta
+    # se resuelve con el índice (status, updated_at) sin ordenar todo lo elegible
+    docs = await db()["orders"].find(query).limit(batch_size).to_list(batch_size)
+    if not docs:
+        return 0, 0
+
+    archived_at = datetime.now(timezone.utc)
+    try:
+        await db()["orders_archive"].insert_many(
+            [{**doc, "archived_at": archived_at} for doc in docs], ordered=False
+        )
+    except BulkWriteError as e:
+        # Duplicados = copiados por una pasada anterior interrumpida; cualquier otro error aborta
+        if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+            raise
+    ids = [doc["_id"] for doc in docs]
+    res = await db()["orders"].delete_many({"_id": {"$in": ids}, "status": {"$in": TERMINAL_STATUSES}})
+    metrics.orders_archived_total.inc(res.deleted_count)
+    return len(docs), res.deleted_count
+
+
+async def archive_once(now: Optional[datetime] = None) -> int:
+    """Archiva todo lo elegible en lotes con rate limiting. Devuelve el total movido por este proceso."""
+    now = now or datetime.now(timezone.utc)
+    cutoff = now - timedelta(seconds=settings.archive_min_age_seconds)
+    total = 0
+    while True:
+        read, moved = await archive_batch(cutoff, settings.archive_batch_size)
+        total += moved
+        if read < settings.archive_batch_size:
+            break
+        await asyncio.sleep(read / settings.archive_max_docs_per_second)
+    log.info("archiver.run.done", archived=total, cutoff=cutoff.isoformat())
+    return total
+
+
+async def run_archiver() -> None:
+    """Loop de background (lifespan): una pasada cada `archive_interval_seconds`."""
+    while True:
+        try:
+            await archive_once()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.warning("archiver.run.failed", error=str(e))
+        await asyncio.sleep(settings.archive_interval_seconds)
+
+
+async def _main(once: bool) -> None:
+    await connect_to_mongo()
+    try:
+        await ensure_indexes()
+        if once:
+            await archive_once()
+        else:
+            await run_archiver()
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive terminal orders to orders_archive.")
+    parser.add_argument("--once", action="store_true", help="run a single pass and exit")
+    asyncio.run(_main(parser.parse_args().once))
@@ -1,16 +1,25 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
+import asyncio
+import copy
+import random
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
 from typing import Optional
 
+import structlog
 from bson import ObjectId, errors
+from pymongo.errors import DuplicateKeyError
 
+from app.config import settings
 from app.domain import errors as domain_errors
 from app.domain.models import OrderIn, OrderOut, StatusUpdate
 from app.infra import metrics
+from app.infra.admission import outside_admission, shed
+from app.infra.profiling import phase
 from app.infra.mongo import db
 from app.utils import idempotency as idem
+from app.utils.keyed_lock import KeyBusy, KeyedLock
 
 ALLOWED_TRANSITIONS = {
     "CREATED": {"PAID", "CANCELLED"},
@@ -19,6 +28,11 @@ ALLOWED_TRANSITIONS = {
     "CANCELLED": set(),
 }
 
+log = structlog.get_logger("orders")
+
+# Serializa transiciones concurrentes de la misma orden dentro del worker
+_order_locks = KeyedLock()
+
 # TODO: Migrar a BSON Decimal128 en producción (Decimal -> Decimal128 al persistir; Decimal128 -> str/Decimal al leer).
 def _persistable_doc_from_payload(payload: OrderIn) -> dict:
     """Mongo-safe: Decimal -> str en items[].price y amount; timestamps en UTC; version inicial."""
@@ -51,65 +65,210 @@ def _order_out_from_doc(doc: dict) -> OrderOut:
             item["price"] = Decimal(item["price"])
     return OrderOut.model_validate(doc)
 
+def _as_utc(value: datetime) -> datetime:
+    # Motor devuelve datetimes naive (UTC) salvo tz_aware=True
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+def _as_stored(doc: dict) -> dict:
+    """Copia del documento tal como lo devolverá Mongo: datetimes naive UTC con precisión de ms."""
+    # deepcopy: _order_out_from_doc convierte items[].price a Decimal in-place
+    stored = copy.deepcopy(doc)
+    for key, value in stored.items():
+        if isinstance(value, datetime):
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+            stored[key] = value.replace(microsecond=value.microsecond // 1000 * 1000)
+    return stored
+
+def _creation_snapshot(doc: dict) -> OrderOut:
+    """La respuesta 201 original: al crearse, toda orden está en CREATED, versión 1 y sin updates."""
+    return _order_out_from_doc({**doc, "status": "CREATED", "version": 1, "updated_at": doc["created_at"]})
+
+async def _create_order_embedded(payload: OrderIn, idempotency_key: str) -> OrderOut:
+    """
+    Idempotencia embebida: la clave viaja en el propio documento de la orden, así
+    que crear es un único insert (sin lookup, re-lectura ni upsert en
+    `idempotency`). Un duplicado vigente reproduce la respuesta original aunque la
+    orden haya cambiado después; uno expirado libera la clave.
+    """
+    with phase("build_document"):
+        document = _persistable_doc_from_payload(payload)
+        document["_id"] = ObjectId()
+        order = _order_out_from_doc(_as_stored(document))
+    document["idempotency_key"] = idempotency_key
+    document["idempotency_expires_at"] = document["created_at"] + timedelta(seconds=settings.idempotency_ttl_seconds)
+
+    for _ in range(2):
+        try:
+            with phase("mongo_insert"):
+                await db()["orders"].insert_one(document)
+        except DuplicateKeyError:
+            with phase("idempotency_lookup"):
+                existing = await db()["orders"].find_one({"idempotency_key": idempotency_key})
+            if existing is None:
+                # La clave se liberó entre el insert y la lectura: reintentar
+                continue
+            if _as_utc(existing["idempotency_expires_at"]) > datetime.now(timezone.utc):
+                with phase("serialization"):
+                    return _creation_snapshot(existing)
+            # Clave expirada: se libera de la orden anterior y se reintenta
+            await db()["orders"].update_one(
+                {"_id": existing["_id"], "idempotency_key": idempotency_key},
+                {"$unset": {"idempotency_key": "", "idempotency_expires_at": ""}},
+            )
+            continue
+
+        metrics.orders_created_total.inc()
+        return order
+
+    raise domain_errors.Conflict("idempotency key is being processed, retry")
+
+async def release_expired_idempotency_keys(now: Optional[datetime] = None) -> int:
+    """Quita de las órdenes las claves embebidas ya expiradas. Devuelve cuántas liberó."""
+    now = now or datetime.now(timezone.utc)
+    res = await db()["orders"].update_many(
+        {"idempotency_expires_at": {"$lte": now}},
+        {"$unset": {"idempotency_key": "", "idempotency_expires_at": ""}},
+    )
+    return res.modified_count
+
+async def run_idempotency_sweeper() -> None:
+    """
+    Loop de background (lifespan, modo embedded): sin él una clave sólo se libera
+    si vuelve a usarse, y el índice único de `idempotency_key` crece sin límite.
+    """
+    while True:
+        try:
+            released = await release_expired_idempotency_keys()
+            log.info("idempotency.sweep.done", released=released)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.warning("idempotency.sweep.failed", error=str(e))
+        await asyncio.sleep(settings.idempotency_sweep_interval_seconds)
+
 async def create_order(payload: OrderIn, idempotency_key: Optional[str]) -> OrderOut:
+    if idempotency_key and settings.idempotency_mode == "embedded":
+        return await _create_order_embedded(payload, idempotency_key)
+
     # Idempotencia: si existe, devolvemos lo guardado
-    cached = await idem.get_cached_result(idempotency_key)
+    with phase("idempotency_lookup"):
+        cached = await idem.get_cached_result(idempotency_key)
     if cached:
         # Reconstruimos OrderOut desde el resultado cacheado
         return OrderOut.model_validate(cached["result"])
 
-    document = _persistable_doc_from_payload(payload)
-    res = await db()["orders"].insert_one(document)
-    created = await db()["orders"].find_one({"_id": res.inserted_id})
+    with phase("build_document"):
+        document = _persistable_doc_from_payload(payload)
+    with phase("mongo_insert"):
+        res = await db()["orders"].insert_one(document)
+        created = await db()["orders"].find_one({"_id": res.inserted_id})
 
     # Increment metric for created orders
     metrics.orders_created_total.inc()
 
-    order = _order_out_from_doc(created)
+    with phase("serialization"):
+        order = _order_out_from_doc(created)
     
     if idempotency_key:
         # Status code and headers are handled by the route/exception handler layer
-        await idem.save_result(idempotency_key, result=order.model_dump(), status_code=201)
+        with phase("idempotency_save"):
+            await idem.save_result(
+                idempotency_key,
+                result=order.model_dump(),
+                status_code=201,
+                ttl_seconds=settings.idempotency_ttl_seconds,
+            )
     return order
 
+async def _find_order(oid: ObjectId) -> Optional[dict]:
+    """Busca en `orders` y, si no está, en `orders_archive` (órdenes terminales archivadas)."""
+    doc = await db()["orders"].find_one({"_id": oid})
+    if doc or not settings.archive_read_fallback:
+        return doc
+    doc = await db()["orders_archive"].find_one({"_id": oid})
+    metrics.archive_fallback_reads_total.labels(result="hit" if doc else "miss").inc()
+    return doc
+
 async def get_order(order_id: str) -> OrderOut:
     try:
         oid = ObjectId(order_id)
     except errors.InvalidId as e:
         raise domain_errors.NotFound("order not found") from e
 
-    doc = await db()["orders"].find_one({"_id": oid})
+    doc = await _find_order(oid)
     if not doc:
         raise domain_errors.NotFound("order not found")
     return _order_out_from_doc(doc)
 
+def _retry_delay(attempt: int) -> float:
+    """Full jitter: uniforme en [0, base * 2^(attempt-1)] segundos."""
+    cap = settings.status_update_retry_backoff_ms * (2 ** (attempt - 1)) / 1000
+    return random.uniform(0, cap)  # noqa: S311
+
 async def update_status(order_id: str, payload: StatusUpdate, expected_version: int) -> OrderOut:
     try:
         oid = ObjectId(order_id)
     except errors.InvalidId as e:
         raise domain_errors.NotFound("order not found") from e
 
-    current = await db()["orders"].find_one({"_id": oid})
+    if not settings.status_update_serialize:
+        return await _update_status(oid, payload, expected_version)
+
+    # Clave canónica: variantes de mayúsculas del mismo ObjectId comparten lock.
+    # La espera del lock no es carga de Mongo: no ocupa slot ni cuenta como latencia.
+    try:
+        async with _order_locks.hold(
+            str(oid), max_waiters=settings.status_update_max_waiters, waiting=outside_admission
+        ):
+            return await _update_status(oid, payload, expected_version)
+    except KeyBusy:
+        # Orden caliente, no conflicto de versión: 503 + Retry-After para que el cliente espere
+        shed("PATCH /orders/{order_id}", "hot_key")
+
+async def _update_status(oid: ObjectId, payload: StatusUpdate, expected_version: int) -> OrderOut:
+    # Una orden archivada es terminal: cae en InvalidTransition en vez de 404
+    current = await _find_order(oid)
     if not current:
         raise domain_errors.NotFound("order not found")
 
-    cur_status: str = current["status"]
     new_status: str = payload.status
+    attempt = 0
+    while True:
+        cur_status: str = current["status"]
 
-    # Regla de dominio (simplificada): validar transición
-    allowed = ALLOWED_TRANSITIONS.get(cur_status, set())
-    if new_status not in allowed:
-        raise domain_errors.InvalidTransition(f"invalid transition from {cur_status} to {new_status}")
+        # Regla de dominio (simplificada): validar transición
+        allowed = ALLOWED_TRANSITIONS.get(cur_status, set())
+        if new_status not in allowed:
+            raise domain_errors.InvalidTransition(f"invalid transition from {cur_status} to {new_status}")
+
+        # Control optimista de concurrencia por versión. Las versiones sólo crecen:
+        # si la leída ya no coincide, el update condicional fallaría seguro.
+        result = None
+        if current["version"] == expected_version:
+            result = await db()["orders"].find_one_and_update(
+                {"_id": oid, "version": expected_version},
+                {"$set": {"status": new_status, "updated_at": datetime.now(timezone.utc)}, "$inc": {"version": 1}},
+                return_document=True, # type: ignore
+            )
+        if result:
+            break
 
-    # Control optimista de concurrencia por versión
-    result = await db()["orders"].find_one_and_update(
-        {"_id": oid, "version": expected_version},
-        {"$set": {"status": new_status, "updated_at": datetime.now(timezone.utc)}, "$inc": {"version": 1}},
-        return_document=True, # type: ignore
-    )
-    if not result:
         # No coincidió la versión
-        raise domain_errors.Conflict("version mismatch")
+        metrics.status_update_conflicts_total.inc()
+        if payload.expected_status is None or attempt >= settings.status_update_max_retries:
+            raise domain_errors.Conflict("version mismatch")
+
+        attempt += 1
+        metrics.status_update_retries_total.inc()
+        if current["version"] == expected_version:
+            # Perdimos la carrera contra otro writer: backoff y releer
+            await asyncio.sleep(_retry_delay(attempt))
+            current = await db()["orders"].find_one({"_id": oid})
+            if not current:
+                raise domain_errors.NotFound("order not found")
+        if current["status"] != payload.expected_status:
+            raise domain_errors.Conflict(f"status changed to {current['status']}")
+        expected_version = current["version"]
 
     # Increment metric for state transitions
     metrics.state_transitions_total.labels(from_status=cur_status, to_status=new_status).inc()
@@ -9,6 +9,7 @@ def problem(
     *,
     code: Optional[str] = None,
     details: Optional[Any] = None,
+    headers: Optional[Dict[str, str]] = None,
 ) -> ORJSONResponse:
     """
     Devuelve un error con shape consistente.
@@ -29,4 +30,4 @@ def problem(
             "request_id": request_context.get_request_id(),
         }
     }
-    return ORJSONResponse(status_code=status_code, content=body)
\ No newline at end of file
+    return ORJSONResponse(status_code=status_code, content=body, headers=headers)
\ No newline at end of file
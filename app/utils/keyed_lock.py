@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import asyncio
+from contextlib import AbstractContextManager, asynccontextmanager
+from typing import AsyncIterator, Callable, Optional
+
+
+class KeyBusy(Exception):
+    pass
+
+
+class KeyedLock:
+    """
+    Un asyncio.Lock por clave, creado bajo demanda y liberado al quedar sin usuarios.
+
+    Serializa operaciones sobre la misma clave dentro del proceso (un worker);
+    no coordina entre workers/réplicas.
+    """
+
+    def __init__(self) -> None:
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._refs: dict[str, int] = {}
+
+    @asynccontextmanager
+    async def hold(
+        self,
+        key: str,
+        max_waiters: Optional[int] = None,
+        waiting: Optional[Callable[[], AbstractContextManager]] = None,
+    ) -> AsyncIterator[None]:
+        """
+        Si ya hay `max_waiters` esperando por `key`, falla rápido con `KeyBusy`.
+        Si hay que esperar, la espera corre dentro de `waiting()` cuando se pasa.
+        """
+        if max_waiters is not None and self._refs.get(key, 0) - 1 >= max_waiters:
+            raise KeyBusy(key)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._refs[key] = self._refs.get(key, 0) + 1
+        try:
+            if waiting is not None and lock.locked():
+                with waiting():
+                    await lock.acquire()
+            else:
+                await lock.acquire()
+            try:
+                yield
+            finally:
+                lock.release()
+        finally:
+            self._refs[key] -= 1
+            if self._refs[key] == 0:
+                del self._refs[key]
+                del self._locks[key]
+
+    def __len__(self) -> int:
+        return len(self._locks)
@@ -0,0 +1,115 @@
+"""
+Benchmark: bytes y CPU por respuesta según clase de tamaño y encoding.
+
+Usa payloads JSON con forma de orden (serializados con orjson, como
+ORJSONResponse) y los mismos encoders que `CompressionMiddleware`, para
+calibrar `compression_minimum_size` y los niveles. Las órdenes varían en ids,
+clientes, items, importes y timestamps (semilla fija) para no inflar el ratio.
+
+Dos modos por encoding:
+- `oneshot`: body completo con `finish()` (respuesta con Content-Length).
+- `stream`: body en chunks de `--chunk-size` por `compress()` (sync flush por
+  chunk, como hace el middleware al hacer streaming) y `finish()` al final.
+
+    python -m benchmarks.bench_compression [--iterations 200] [--chunk-size 4096]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+import orjson
+
+from app.config import settings
+from app.infra.compression import CompressionMiddleware, available_encodings
+
+SIZE_CLASSES = [256, 1024, 8 * 1024, 64 * 1024, 512 * 1024]
+STATUSES = ["CREATED", "PAID", "FULFILLED", "CANCELLED"]
+CURRENCIES = ["USD", "EUR", "GBP", "MXN"]
+
+
+def _order(rng: random.Random, base: datetime) -> dict:
+    items = [
+        {
+            "sku": f"SKU-{rng.randrange(100_000):05d}",
+            "qty": rng.randint(1, 5),
+            "price": f"{rng.randint(99, 99_999) / 100:.2f}",
+        }
+        for _ in range(rng.randint(1, 5))
+    ]
+    created = base - timedelta(seconds=rng.randrange(90 * 86400), microseconds=rng.randrange(10**6))
+    updated = created + timedelta(seconds=rng.randrange(86400))
+    amount = sum(item["qty"] * float(item["price"]) for item in items)
+    return {
+        "id": f"{rng.getrandbits(96):024x}",
+        "customer_id": f"cust-{rng.randrange(50_000)}",
+        "status": rng.choice(STATUSES),
+        "amount": f"{amount:.2f}",
+        "currency": rng.choice(CURRENCIES),
+        "items": items,
+        "created_at": created.isoformat(),
+        "updated_at": updated.isoformat(),
+        "version": rng.randint(1, 4),
+    }
+
+
+def _payload(target_size: int) -> bytes:
+    """Lista de órdenes serializada, recortada al número de órdenes que cabe en `target_size`."""
+    rng = random.Random(target_size)
+    base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    orders = []
+    body = orjson.dumps(orders)
+    while len(body) < target_size:
+        orders.append(_order(rng, base))
+        body = orjson.dumps(orders)
+    if len(orders) <= 1:
+        return orjson.dumps(orders[0])[:target_size]
+    return orjson.dumps(orders[:-1])
+
+
+def _chunks(body: bytes, chunk_size: int) -> list[bytes]:
+    return [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+
+
+def _oneshot(middleware: CompressionMiddleware, encoding: str, body: bytes) -> int:
+    return len(middleware.encoder(encoding).finish(body))
+
+
+def _stream(middleware: CompressionMiddleware, encoding: str, chunks: list[bytes]) -> int:
+    encoder = middleware.encoder(encoding)
+    size = sum(len(encoder.compress(chunk)) for chunk in chunks[:-1])
+    return size + len(encoder.finish(chunks[-1]))
+
+
+def main(iterations: int, chunk_size: int) -> None:
+    middleware = CompressionMiddleware(
+        app=None,  # type: ignore[arg-type]
+        gzip_level=settings.compression_gzip_level,
+        brotli_quality=settings.compression_brotli_quality,
+        zstd_level=settings.compression_zstd_level,
+    )
+    print(f"{'size':>8} {'encoding':>8} {'mode':>7} {'bytes':>9} {'ratio':>6} {'cpu_us':>9}")
+    for size in SIZE_CLASSES:
+        body = _payload(size)
+        chunks = _chunks(body, chunk_size)
+        print(f"{len(body):>8} {'identity':>8} {'-':>7} {len(body):>9} {1.0:>6.2f} {0.0:>9.1f}")
+        for encoding in available_encodings():
+            runs = [("oneshot", lambda: _oneshot(middleware, encoding, body))]
+            if len(chunks) > 1:
+                runs.append(("stream", lambda: _stream(middleware, encoding, chunks)))
+            for mode, run in runs:
+                start = time.process_time()
+                for _ in range(iterations):
+                    out = run()
+                cpu_us = (time.process_time() - start) / iterations * 1e6
+                print(f"{len(body):>8} {encoding:>8} {mode:>7} {out:>9} {out / len(body):>6.2f} {cpu_us:>9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--chunk-size", type=int, default=4096, help="bytes por chunk en el modo stream")
+    args = parser.parse_args()
+    main(args.iterations, args.chunk_size)
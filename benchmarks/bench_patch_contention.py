@@ -0,0 +1,110 @@
+"""
+Benchmark: N PATCH concurrentes sobre una misma orden (hot key).
+
+Compara, contra Mongo en memoria (mongomock), el modo clásico (If-Match → 409
+inmediato) frente a `expected_status` con reintento en servidor, con y sin la
+cola de serialización por orden. Cada operación Mongo añade `--latency-ms` para
+que los requests realmente se intercalen. Reporta códigos HTTP, round trips a
+Mongo y las métricas de conflictos/reintentos.
+
+    python -m benchmarks.bench_patch_contention [--n 100] [--latency-ms 2]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import time
+from collections import Counter
+from unittest.mock import patch
+
+from httpx import ASGITransport, AsyncClient
+from mongomock_motor import AsyncMongoMockClient
+
+from app.config import settings
+from app.infra import metrics
+from app.main import app
+
+BODY = {"customer_id": "bench", "currency": "USD", "items": [{"sku": "B", "qty": 1, "price": "1.00"}]}
+
+
+class CountingDb:
+    """Envuelve la DB para contar operaciones y simular latencia de red."""
+
+    def __init__(self, inner, latency: float) -> None:
+        self.inner = inner
+        self.latency = latency
+        self.ops: Counter[str] = Counter()
+
+    def __getitem__(self, name):
+        return CountingCollection(self.inner[name], self.ops, self.latency)
+
+
+class CountingCollection:
+    def __init__(self, inner, ops: Counter, latency: float) -> None:
+        self.inner = inner
+        self.ops = ops
+        self.latency = latency
+
+    def __getattr__(self, name):
+        attr = getattr(self.inner, name)
+        if not callable(attr):
+            return attr
+
+        async def call(*args, **kwargs):
+            self.ops[name] += 1
+            await asyncio.sleep(self.latency)
+            return await attr(*args, **kwargs)
+
+        return call
+
+
+def _counter_value(counter) -> float:
+    return counter._value.get()
+
+
+async def run(n: int, latency: float, *, expected_status: bool, serialize: bool) -> None:
+    counting = CountingDb(AsyncMongoMockClient()["bench"], latency)
+    with patch("app.services.orders_service.db", return_value=counting), \
+         patch("app.utils.idempotency.db", return_value=counting), \
+         patch.object(settings, "status_update_serialize", serialize), \
+         patch.object(settings, "admission_max_queue", n):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+            oid = (await client.post("/orders", json=BODY)).json()["id"]
+            counting.ops.clear()
+            conflicts0 = _counter_value(metrics.status_update_conflicts_total)
+            retries0 = _counter_value(metrics.status_update_retries_total)
+
+            payload = {"status": "PAID"}
+            if expected_status:
+                payload["expected_status"] = "CREATED"
+            start = time.perf_counter()
+            responses = await asyncio.gather(*(
+                client.patch(f"/orders/{oid}", json=payload, headers={"If-Match": "1"})
+                for _ in range(n)
+            ))
+            elapsed = time.perf_counter() - start
+
+    codes = Counter(r.status_code for r in responses)
+    print(
+        f"expected_status={expected_status!s:<5} serialize={serialize!s:<5} "
+        f"codes={dict(sorted(codes.items()))} mongo_ops={sum(counting.ops.values())} "
+        f"({dict(counting.ops)}) conflicts={_counter_value(metrics.status_update_conflicts_total) - conflicts0:.0f} "
+        f"retries={_counter_value(metrics.status_update_retries_total) - retries0:.0f} "
+        f"wall={elapsed * 1000:.1f}ms"
+    )
+
+
+async def main(n: int, latency: float) -> None:
+    for expected_status in (False, True):
+        for serialize in (False, True):
+            await run(n, latency, expected_status=expected_status, serialize=serialize)
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)  # silenciar request logs/httpx durante la medición
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--n", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=2.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.n, args.latency_ms / 1000))
@@ -2,6 +2,7 @@ import pytest_asyncio
 from httpx import AsyncClient, ASGITransport
 from unittest.mock import patch
 from mongomock_motor import AsyncMongoMockClient
+from app.config import settings
 from app.main import app, lifespan
 
 @pytest_asyncio.fixture
@@ -18,4 +19,22 @@ async def test_client():
                 transport=ASGITransport(app=app),
                 base_url="http://test",
             ) as client:
-                yield client
\ No newline at end of file
+                yield client
+
+
+@pytest_asyncio.fixture
+async def embedded_client():
+    # Como test_client, pero en idempotency_mode="embedded" y con los índices
+    # creados por el arranque real (ensure_indexes) sobre la DB en memoria
+    fake_db = AsyncMongoMockClient()["testdb"]
+
+    with patch.object(settings, "idempotency_mode", "embedded"), \
+         patch("app.infra.mongo.db", return_value=fake_db), \
+         patch("app.services.orders_service.db", return_value=fake_db), \
+         patch("app.utils.idempotency.db", return_value=fake_db):
+        async with lifespan(app):
+            async with AsyncClient(
+                transport=ASGITransport(app=app),
+                base_url="http://test",
+            ) as client:
+                yield client
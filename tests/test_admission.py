@@ -0,0 +1,118 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from bson import ObjectId
+
+from app.config import settings
+from app.infra.admission import AdaptiveLimiter, Overloaded, controller
+
+
+class SlowCollection:
+    """Stand-in de una colección Mongo lenta: cada find_one tarda `delay` segundos."""
+
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+
+    async def find_one(self, *args, **kwargs):
+        await asyncio.sleep(self.delay)
+        return None
+
+
+class SlowDb:
+    def __init__(self, delay: float) -> None:
+        self.collection = SlowCollection(delay)
+
+    def __getitem__(self, name):
+        return self.collection
+
+
+def _limiter(**overrides) -> AdaptiveLimiter:
+    opts = dict(
+        initial_limit=2, min_limit=1, max_limit=4,
+        max_queue=1, queue_timeout=0.05, latency_target=0.1,
+    )
+    opts.update(overrides)
+    return AdaptiveLimiter("TEST /x", **opts)
+
+
+@pytest.mark.asyncio
+async def test_limiter_sheds_when_queue_is_full():
+    limiter = _limiter()
+    await limiter.acquire()
+    await limiter.acquire()
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    with pytest.raises(Overloaded) as exc:
+        await limiter.acquire()
+    assert exc.value.reason == "queue_full"
+
+    # Al liberar un slot, el que espera en cola lo recibe
+    limiter.release(0.01)
+    await waiter
+    assert limiter.inflight == 2
+
+
+@pytest.mark.asyncio
+async def test_limiter_sheds_on_queue_timeout():
+    limiter = _limiter(initial_limit=1)
+    await limiter.acquire()
+    with pytest.raises(Overloaded) as exc:
+        await limiter.acquire()
+    assert exc.value.reason == "queue_timeout"
+    assert limiter.inflight == 1
+
+
+def test_limiter_aimd_adjusts_on_latency():
+    limiter = _limiter(initial_limit=4)
+    limiter.inflight = 4
+    limiter.release(1.0)  # lento → decrease multiplicativo
+    assert limiter.limit == pytest.approx(3.6)
+    limiter.inflight = 4
+    limiter.release(0.01)  # rápido y con el límite en uso → increase aditivo
+    assert limiter.limit == pytest.approx(3.6 + 1 / 3.6)
+
+
+@pytest.mark.asyncio
+async def test_limiter_decreases_once_per_latency_window():
+    limiter = _limiter(initial_limit=64, min_limit=4, max_limit=512, max_queue=0, latency_target=0.25)
+    for _ in range(64):
+        await limiter.acquire()
+    # Una ventana completa de requests lentos (todos empezaron antes del recorte)
+    for _ in range(64):
+        limiter.release(0.3)
+    assert limiter.limit == pytest.approx(64 * 0.9)
+    assert limiter.inflight == 0
+
+
+def test_limiter_does_not_grow_when_underutilized():
+    limiter = _limiter(initial_limit=64, max_limit=512)
+    for _ in range(5000):
+        limiter.inflight = 1
+        limiter.release(0.01)
+    assert limiter.limit == 64
+
+
+@pytest.mark.asyncio
+async def test_slow_mongo_sheds_with_retry_after_and_health_is_exempt(test_client):
+    controller.reset()
+    fake_db = AsyncMock()
+    fake_db.command = AsyncMock(return_value={"ok": 1})
+    with patch.object(settings, "admission_initial_limit", 1), \
+         patch.object(settings, "admission_min_limit", 1), \
+         patch.object(settings, "admission_max_queue", 1), \
+         patch.object(settings, "admission_queue_timeout_seconds", 0.05), \
+         patch("app.services.orders_service.db", return_value=SlowDb(delay=0.3)), \
+         patch("app.main.db", return_value=fake_db):
+        oid = str(ObjectId())
+        orders = [test_client.get(f"/orders/{oid}") for _ in range(5)]
+        results = await asyncio.gather(*orders, test_client.get("/health"))
+    controller.reset()
+
+    *order_responses, health = results
+    shed = [r for r in order_responses if r.status_code == 503]
+    assert len(shed) == 4
+    assert all(r.headers["Retry-After"] == str(settings.admission_retry_after_seconds) for r in shed)
+    assert all(r.json()["error"]["code"] == "overloaded" for r in shed)
+    assert sum(r.status_code == 404 for r in order_responses) == 1
+    assert health.status_code == 200
@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import pytest
+from httpx import AsyncClient
+
+from app.config import settings
+from app.services import archive_service, orders_service
+
+pytestmark = pytest.mark.asyncio
+
+NOW = datetime(2026, 1, 31, tzinfo=timezone.utc)
+OLD = NOW - timedelta(days=60)
+
+
+def _order(status: str, updated_at: datetime) -> dict:
+    return {
+        "customer_id": "c-arch",
+        "currency": "USD",
+        "items": [{"sku": "A", "qty": 1, "price": "1.00"}],
+        "status": status,
+        "version": 3,
+        "amount": "1.00",
+        "created_at": updated_at,
+        "updated_at": updated_at,
+    }
+
+
+async def test_archiver_moves_old_terminal_orders_and_reads_fall_back(test_client: AsyncClient):
+    fake_db = orders_service.db()
+    orders = fake_db["orders"]
+    old_fulfilled = (await orders.insert_one(_order("FULFILLED", OLD))).inserted_id
+    old_cancelled = (await orders.insert_one(_order("CANCELLED", OLD))).inserted_id
+    old_created = (await orders.insert_one(_order("CREATED", OLD))).inserted_id
+    recent_fulfilled = (await orders.insert_one(_order("FULFILLED", NOW))).inserted_id
+    # Simula una pasada previa interrumpida tras copiar pero antes de borrar
+    await fake_db["orders_archive"].insert_one(await orders.find_one({"_id": old_fulfilled}))
+
+    with patch("app.services.archive_service.db", return_value=fake_db), \
+         patch.object(settings, "archive_batch_size", 1):
+        moved = await archive_service.archive_once(now=NOW)
+        # Reanudable/idempotente: una segunda pasada no encuentra nada
+        assert await archive_service.archive_once(now=NOW) == 0
+
+    assert moved == 2
+    remaining = {doc["_id"] async for doc in orders.find({})}
+    assert remaining == {old_created, recent_fulfilled}
+    archived = {doc["_id"] async for doc in fake_db["orders_archive"].find({})}
+    assert archived == {old_fulfilled, old_cancelled}
+
+    # GET transparente sobre el archivo
+    r = await test_client.get(f"/orders/{old_fulfilled}")
+    assert r.status_code == 200
+    assert r.json()["status"] == "FULFILLED"
+
+    # Una orden archivada es terminal: PATCH → 422, no 404
+    r = await test_client.patch(
+        f"/orders/{old_cancelled}", json={"status": "PAID"}, headers={"If-Match": "3"}
+    )
+    assert r.status_code == 422
+
+
+class _RacingDb:
+    """Stand-in de Mongo donde otro worker archiva una orden del lote justo antes de nuestro borrado."""
+
+    def __init__(self, inner) -> None:
+        self.inner = inner
+        self.raced = False
+
+    def __getitem__(self, name):
+        coll = self.inner[name]
+        if name != "orders":
+            return coll
+        outer = self
+
+        class Orders:
+            def __getattr__(self, attr):
+                return getattr(coll, attr)
+
+            async def delete_many(self, query):
+                if not outer.raced:
+                    outer.raced = True
+                    await coll.delete_one({"_id": query["_id"]["$in"][0]})
+                return await coll.delete_many(query)
+
+        return Orders()
+
+
+async def test_archiver_pass_continues_when_another_worker_took_part_of_a_batch(test_client: AsyncClient):
+    fake_db = orders_service.db()
+    ids = [(await fake_db["orders"].insert_one(_order("FULFILLED", OLD))).inserted_id for _ in range(4)]
+
+    with patch("app.services.archive_service.db", return_value=_RacingDb(fake_db)), \
+         patch.object(settings, "archive_batch_size", 2):
+        moved = await archive_service.archive_once(now=NOW)
+
+    # El primer lote sólo borra 1 de 2, pero la pasada sigue y vacía lo elegible
+    assert moved == 3
+    assert await fake_db["orders"].count_documents({"_id": {"$in": ids}}) == 0
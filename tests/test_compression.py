@@ -0,0 +1,62 @@
+import gzip
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from starlette.applications import Starlette
+from starlette.responses import StreamingResponse
+from starlette.routing import Route
+
+from app.infra.compression import CompressionMiddleware, negotiate
+
+
+def test_negotiate_respects_q_values_and_server_preference():
+    supported = ["br", "zstd", "gzip"]
+    assert negotiate(None, supported) is None
+    assert negotiate("identity", supported) is None
+    assert negotiate("gzip, deflate", supported) == "gzip"
+    assert negotiate("gzip, br", supported) == "br"
+    assert negotiate("gzip;q=1.0, br;q=0.5", supported) == "gzip"
+    assert negotiate("*", ["gzip"]) == "gzip"
+    assert negotiate("gzip;q=0", ["gzip"]) is None
+
+
+@pytest.mark.asyncio
+async def test_small_responses_are_not_compressed(test_client: AsyncClient):
+    r = await test_client.get("/__nope__", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in r.headers
+    assert r.headers["vary"] == "Accept-Encoding"
+
+
+@pytest.mark.asyncio
+async def test_large_error_responses_are_gzipped(test_client: AsyncClient):
+    body = {"customer_id": "c1", "items": [{"sku": f"S{i}", "qty": 0, "price": "1.00"} for i in range(200)]}
+    async with test_client.stream("POST", "/orders", json=body, headers={"Accept-Encoding": "gzip"}) as r:
+        raw = b"".join([part async for part in r.aiter_raw()])
+    assert r.status_code == 400
+    assert r.headers["content-encoding"] == "gzip"
+
+    plain = await test_client.post("/orders", json=body, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert gzip.decompress(raw) == plain.content.replace(
+        plain.json()["error"]["request_id"].encode(), r.headers["x-request-id"].encode()
+    )
+    assert len(raw) < len(plain.content) / 5
+
+
+@pytest.mark.asyncio
+async def test_streaming_responses_are_compressed_incrementally():
+    chunks = [b'{"chunk": "' + b"x" * 100 + b'"}\n' for _ in range(50)]
+
+    async def stream(request):
+        async def gen():
+            for chunk in chunks:
+                yield chunk
+        return StreamingResponse(gen(), media_type="application/json")
+
+    app = CompressionMiddleware(Starlette(routes=[Route("/stream", stream)]), minimum_size=1024)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        async with client.stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as r:
+            raw = b"".join([part async for part in r.aiter_raw()])
+    assert r.headers["content-encoding"] == "gzip"
+    assert "content-length" not in r.headers
+    assert gzip.decompress(raw) == b"".join(chunks)
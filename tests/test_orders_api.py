@@ -1,8 +1,14 @@
+from unittest.mock import patch
+
 import pytest
+from bson import ObjectId
 from httpx import AsyncClient
+from pymongo.errors import OperationFailure
 
+from app.config import settings
 from app.infra.mongo import db
-from app.main import app
+from app.main import app, lifespan
+from app.services import orders_service
 
 pytestmark = pytest.mark.anyio
 
@@ -58,4 +64,81 @@ async def test_patch_with_optimistic_locking_and_transitions(test_client: AsyncC
     r3 = await test_client.patch(
         f"/orders/{oid}", json={"status": "FULFILLED"}, headers={"If-Match": "999"}
     )
-    assert r3.status_code == 409
\ No newline at end of file
+    assert r3.status_code == 409
+
+
+async def test_embedded_idempotency_requires_its_index_at_startup():
+    with patch.object(settings, "idempotency_mode", "embedded"), \
+         patch("app.main.ensure_indexes", side_effect=OperationFailure("index build failed")):
+        with pytest.raises(OperationFailure):
+            async with lifespan(app):
+                pass
+
+
+async def test_embedded_idempotency_replays_same_order(embedded_client: AsyncClient):
+    body = {
+        "customer_id": "c4",
+        "currency": "USD",
+        "items": [{"sku": "D", "qty": 3, "price": "2.00"}],
+    }
+    r1 = await embedded_client.post("/orders", json=body, headers={"Idempotency-Key": "K-EMB"})
+    r2 = await embedded_client.post("/orders", json=body, headers={"Idempotency-Key": "K-EMB"})
+    r3 = await embedded_client.post("/orders", json=body)
+    assert r1.status_code == 201
+    assert r2.status_code == 201
+    assert r2.json() == r1.json()
+    assert r1.json()["amount"] == "6.00"
+    assert r3.json()["id"] != r1.json()["id"]
+
+
+async def test_embedded_idempotency_replays_creation_snapshot(embedded_client: AsyncClient):
+    body = {
+        "customer_id": "c6",
+        "currency": "USD",
+        "items": [{"sku": "F", "qty": 1, "price": "4.00"}],
+    }
+    r1 = await embedded_client.post("/orders", json=body, headers={"Idempotency-Key": "K-SNAP"})
+    oid = r1.json()["id"]
+    r_get = await embedded_client.get(f"/orders/{oid}")
+    r_patch = await embedded_client.patch(f"/orders/{oid}", json={"status": "PAID"}, headers={"If-Match": "1"})
+    r2 = await embedded_client.post("/orders", json=body, headers={"Idempotency-Key": "K-SNAP"})
+    assert r_get.json() == r1.json()
+    assert r_patch.status_code == 200
+    assert r2.status_code == 201
+    # La repetición devuelve la respuesta original (CREATED v1), no el estado actual
+    assert r2.json() == r1.json()
+    assert r2.json()["status"] == "CREATED"
+    assert r2.json()["version"] == 1
+
+
+async def test_embedded_idempotency_key_is_released_after_ttl(embedded_client: AsyncClient):
+    body = {
+        "customer_id": "c5",
+        "currency": "USD",
+        "items": [{"sku": "E", "qty": 1, "price": "1.00"}],
+    }
+    with patch.object(settings, "idempotency_ttl_seconds", 0):
+        r1 = await embedded_client.post("/orders", json=body, headers={"Idempotency-Key": "K-TTL"})
+        r2 = await embedded_client.post("/orders", json=body, headers={"Idempotency-Key": "K-TTL"})
+    assert r1.status_code == r2.status_code == 201
+    assert r2.json()["id"] != r1.json()["id"]
+
+
+async def test_expired_embedded_keys_are_swept_from_orders(embedded_client: AsyncClient):
+    body = {
+        "customer_id": "c7",
+        "currency": "USD",
+        "items": [{"sku": "G", "qty": 1, "price": "1.00"}],
+    }
+    with patch.object(settings, "idempotency_ttl_seconds", 0):
+        expired = (await embedded_client.post("/orders", json=body, headers={"Idempotency-Key": "K-OLD"})).json()
+    live = (await embedded_client.post("/orders", json=body, headers={"Idempotency-Key": "K-LIVE"})).json()
+
+    orders = orders_service.db()["orders"]
+    # Sólo clave y expiración: la respuesta de la repetición se reconstruye del documento
+    doc = await orders.find_one({"idempotency_key": "K-LIVE"})
+    assert not {k for k in doc if k.startswith("idempotency_")} - {"idempotency_key", "idempotency_expires_at"}
+
+    assert await orders_service.release_expired_idempotency_keys() == 1
+    assert "idempotency_key" not in await orders.find_one({"_id": ObjectId(expired["id"])})
+    assert (await orders.find_one({"_id": ObjectId(live["id"])}))["idempotency_key"] == "K-LIVE"
@@ -0,0 +1,109 @@
+import time
+from collections import Counter
+from unittest.mock import patch
+
+import pytest
+from structlog.testing import capture_logs
+
+from app.config import settings
+from app.infra import profiling
+from app.services import orders_service
+
+
+def test_phase_is_noop_when_not_profiling():
+    profiling.clear_phases()
+    with profiling.phase("mongo_insert"):
+        pass
+    assert profiling.get_phases() is None
+
+
+def test_phase_accumulates_named_sections():
+    profiling.start_phases()
+    with profiling.phase("validation"):
+        pass
+    with profiling.phase("validation"):
+        pass
+    phases = profiling.get_phases()
+    profiling.clear_phases()
+    assert set(phases) == {"validation"}
+    assert phases["validation"] >= 0
+
+
+def test_collapsed_stacks_format():
+    profiling.reset_samples()
+    profiling.record_samples(Counter({"main;handler;insert_one": 3, "main;handler": 1}))
+    out = profiling.collapsed_stacks()
+    profiling.reset_samples()
+    assert out.splitlines() == ["main;handler;insert_one 3", "main;handler 1"]
+
+
+@pytest.mark.asyncio
+async def test_admin_profile_disabled_returns_404(test_client):
+    r = await test_client.get("/admin/profile")
+    assert r.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_profiled_request_feeds_admin_endpoint(test_client):
+    body = {"customer_id": "c1", "items": [{"sku": "A", "qty": 1, "price": "1.00"}]}
+    build_document = orders_service._persistable_doc_from_payload
+
+    def slow_build_document(payload):
+        # Trabajo síncrono en el hilo del loop para que el sampler lo vea seguro
+        time.sleep(0.02)
+        return build_document(payload)
+
+    profiling.reset_samples()
+    auth = {"X-Profile": "s3cret"}
+    with patch.object(settings, "profiling_enabled", True), \
+         patch.object(settings, "profiling_token", "s3cret"), \
+         patch.object(settings, "profiling_interval_seconds", 0.001), \
+         patch.object(orders_service, "_persistable_doc_from_payload", slow_build_document):
+        with capture_logs() as logs:
+            r = await test_client.post("/orders", json=body, headers=auth)
+        assert r.status_code == 201
+
+        finished = [e for e in logs if e["event"] == "request_finished"]
+        assert len(finished) == 1
+        phases = finished[0]["phases"]
+        assert {"idempotency_lookup", "build_document", "mongo_insert", "serialization"} <= set(phases)
+        assert phases["build_document"] >= 20
+
+        r = await test_client.get("/admin/profile", headers=auth)
+        assert r.status_code == 200
+        assert r.headers["content-type"].startswith("text/plain")
+        lines = r.text.splitlines()
+        assert lines
+        assert any("slow_build_document (tests/test_profiling.py:" in line for line in lines)
+        assert " (/" not in r.text  # sin rutas absolutas
+        stack, count = lines[0].rsplit(" ", 1)
+        assert ";" in stack and int(count) > 0
+
+        r = await test_client.delete("/admin/profile", headers=auth)
+        assert r.status_code == 204
+        assert profiling.collapsed_stacks() == ""
+
+
+@pytest.mark.asyncio
+async def test_unprofiled_request_has_no_phases(test_client):
+    body = {"customer_id": "c1", "items": [{"sku": "A", "qty": 1, "price": "1.00"}]}
+    with patch.object(settings, "profiling_enabled", True), capture_logs() as logs:
+        await test_client.post("/orders", json=body)
+    finished = [e for e in logs if e["event"] == "request_finished"]
+    assert "phases" not in finished[0]
+
+
+@pytest.mark.asyncio
+async def test_profile_header_requires_configured_token(test_client):
+    body = {"customer_id": "c1", "items": [{"sku": "A", "qty": 1, "price": "1.00"}]}
+    with patch.object(settings, "profiling_enabled", True):
+        with capture_logs() as logs:
+            await test_client.post("/orders", json=body, headers={"X-Profile": "1"})
+        assert "phases" not in [e for e in logs if e["event"] == "request_finished"][0]
+        assert (await test_client.get("/admin/profile")).status_code == 403
+
+        with patch.object(settings, "profiling_token", "s3cret"), capture_logs() as logs:
+            await test_client.post("/orders", json=body, headers={"X-Profile": "1"})
+            assert "phases" not in [e for e in logs if e["event"] == "request_finished"][0]
+            r = await test_client.delete("/admin/profile", headers={"X-Profile": "wrong"})
+            assert r.status_code == 403
@@ -0,0 +1,195 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from httpx import AsyncClient
+
+from app.config import settings
+from app.infra.admission import controller
+from app.services import orders_service
+from app.utils.keyed_lock import KeyBusy, KeyedLock
+
+pytestmark = pytest.mark.asyncio
+
+BODY = {
+    "customer_id": "c3",
+    "currency": "USD",
+    "items": [{"sku": "C", "qty": 1, "price": "3.00"}],
+}
+
+
+class LaggyDb:
+    """Stand-in de Mongo con latencia por operación para que los PATCH se intercalen."""
+
+    def __init__(self, inner, latency: float) -> None:
+        self.inner = inner
+        self.latency = latency
+
+    def __getitem__(self, name):
+        return LaggyCollection(self.inner[name], self.latency)
+
+
+class LaggyCollection:
+    def __init__(self, inner, latency: float) -> None:
+        self.inner = inner
+        self.latency = latency
+
+    def __getattr__(self, name):
+        attr = getattr(self.inner, name)
+
+        async def call(*args, **kwargs):
+            await asyncio.sleep(self.latency)
+            return await attr(*args, **kwargs)
+
+        return call
+
+
+async def _concurrent_paid_patches(client: AsyncClient, n: int, order_ids) -> list[int]:
+    with patch("app.services.orders_service.db", return_value=LaggyDb(orders_service.db(), 0.002)):
+        patches = [
+            client.patch(f"/orders/{order_ids[i % len(order_ids)]}", json={"status": "PAID"}, headers={"If-Match": "1"})
+            for i in range(n)
+        ]
+        return sorted(r.status_code for r in await asyncio.gather(*patches))
+
+
+async def test_keyed_lock_serializes_same_key_and_cleans_up():
+    locks = KeyedLock()
+    events = []
+
+    async def worker(key, name):
+        async with locks.hold(key):
+            events.append(f"{name}:in")
+            await asyncio.sleep(0.01)
+            events.append(f"{name}:out")
+
+    await asyncio.gather(worker("o1", "a"), worker("o1", "b"), worker("o2", "c"))
+    a_or_b = [e for e in events if not e.startswith("c")]
+    assert a_or_b in (["a:in", "a:out", "b:in", "b:out"], ["b:in", "b:out", "a:in", "a:out"])
+    assert len(locks) == 0
+
+
+async def test_expected_status_retries_past_version_bump(test_client: AsyncClient):
+    r = await test_client.post("/orders", json=BODY)
+    oid = r.json()["id"]
+
+    # If-Match desactualizado, pero la orden sigue en CREATED → se reintenta en servidor
+    r1 = await test_client.patch(
+        f"/orders/{oid}",
+        json={"status": "PAID", "expected_status": "CREATED"},
+        headers={"If-Match": "0"},
+    )
+    assert r1.status_code == 200
+    assert r1.json()["status"] == "PAID"
+    assert r1.json()["version"] == 2
+
+
+async def test_expected_status_conflicts_when_status_moved(test_client: AsyncClient):
+    r = await test_client.post("/orders", json=BODY)
+    oid = r.json()["id"]
+    await test_client.patch(f"/orders/{oid}", json={"status": "PAID"}, headers={"If-Match": "1"})
+
+    r1 = await test_client.patch(
+        f"/orders/{oid}",
+        json={"status": "CANCELLED", "expected_status": "CREATED"},
+        headers={"If-Match": "1"},
+    )
+    assert r1.status_code == 409
+
+
+async def test_keyed_lock_fails_fast_when_too_many_waiters():
+    locks = KeyedLock()
+    release = asyncio.Event()
+
+    async def holder():
+        async with locks.hold("o1", max_waiters=1):
+            await release.wait()
+
+    tasks = [asyncio.create_task(holder()), asyncio.create_task(holder())]
+    await asyncio.sleep(0)
+    with pytest.raises(KeyBusy):
+        async with locks.hold("o1", max_waiters=1):
+            pass
+    release.set()
+    await asyncio.gather(*tasks)
+    assert len(locks) == 0
+
+
+async def test_concurrent_patches_on_one_order_are_serialized(test_client: AsyncClient):
+    r = await test_client.post("/orders", json=BODY)
+    oid = r.json()["id"]
+
+    codes = await _concurrent_paid_patches(test_client, 20, [oid])
+    # Serializados: los perdedores ven PAID y fallan por transición, sin gastar el update condicional
+    assert codes.count(200) == 1
+    assert codes.count(422) == 19
+
+
+async def test_concurrent_patches_without_serialization_race(test_client: AsyncClient):
+    r = await test_client.post("/orders", json=BODY)
+    oid = r.json()["id"]
+
+    with patch.object(settings, "status_update_serialize", False):
+        codes = await _concurrent_paid_patches(test_client, 20, [oid])
+    assert codes.count(200) == 1
+    assert codes.count(409) > 0
+
+
+async def test_lock_key_is_canonical_object_id(test_client: AsyncClient):
+    r = await test_client.post("/orders", json=BODY)
+    oid = r.json()["id"]
+
+    codes = await _concurrent_paid_patches(test_client, 2, [oid.lower(), oid.upper()])
+    assert codes == [200, 422]
+
+
+async def test_lock_wait_is_excluded_from_admission_latency(test_client: AsyncClient):
+    r = await test_client.post("/orders", json=BODY)
+    oid = r.json()["id"]
+
+    controller.reset()
+    # 40 PATCH en serie ≈ 40 × 2 ops × 2ms: la cola del lock supera de largo el objetivo
+    with patch.object(settings, "admission_latency_target_ms", 50.0):
+        codes = await _concurrent_paid_patches(test_client, 40, [oid])
+        limiter = controller.limiter_for("PATCH /orders/{order_id}")
+    controller.reset()
+    assert codes.count(200) == 1
+    assert limiter.limit >= settings.admission_initial_limit
+
+
+async def test_hot_order_queue_is_bounded(test_client: AsyncClient):
+    r = await test_client.post("/orders", json=BODY)
+    oid = r.json()["id"]
+
+    with patch.object(settings, "status_update_max_waiters", 2):
+        codes = await _concurrent_paid_patches(test_client, 10, [oid])
+    # 1 con el lock + 2 en cola; el resto se rechaza rápido como sobrecarga, no como 409
+    assert codes.count(200) == 1
+    assert codes.count(422) == 2
+    assert codes.count(503) == 7
+
+    with patch.object(settings, "status_update_max_waiters", 0), \
+         patch("app.services.orders_service.db", return_value=LaggyDb(orders_service.db(), 0.002)):
+        busy = await asyncio.gather(*[
+            test_client.patch(f"/orders/{oid}", json={"status": "FULFILLED"}, headers={"If-Match": "2"})
+            for _ in range(2)
+        ])
+    shed = next(r for r in busy if r.status_code == 503)
+    assert shed.json()["error"]["code"] == "overloaded"
+    assert shed.headers["retry-after"] == str(settings.admission_retry_after_seconds)
+
+
+async def test_hot_order_waiters_do_not_starve_other_orders(test_client: AsyncClient):
+    hot = (await test_client.post("/orders", json=BODY)).json()["id"]
+    others = [(await test_client.post("/orders", json=BODY)).json()["id"] for _ in range(5)]
+
+    controller.reset()
+    with patch.object(settings, "admission_initial_limit", 8), \
+         patch.object(settings, "admission_max_queue", 4):
+        # Los 30 sobre la orden caliente esperan el lock sin ocupar slots de la ruta
+        codes = await _concurrent_paid_patches(test_client, 30 + len(others), [hot] * 30 + others)
+        limiter = controller.limiter_for("PATCH /orders/{order_id}")
+    controller.reset()
+    assert 503 not in codes
+    assert codes.count(200) == 1 + len(others)
+    assert limiter.inflight == 0